@@ -1,29 +1,36 @@
 import logging
+import logging.handlers
 import re
+import difflib
 import datetime
-import aiocron
 import asyncio
 import time
 import pytz
-from collections import defaultdict
-from pymongo import MongoClient, errors
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackContext, filters
+from collections import OrderedDict, defaultdict
+from pymongo import AsyncMongoClient, InsertOne, UpdateOne, errors
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaDocument
+from telegram.ext import AIORateLimiter, ApplicationBuilder, BaseUpdateProcessor, CommandHandler, MessageHandler, CallbackContext, filters
 from dotenv import load_dotenv
 import os
-import nest_asyncio
+import signal
 import uuid
 import random
 from aiohttp import web
 from telegram.ext import CallbackQueryHandler
 import aiohttp
 
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 # Custom Timezone Formatter
+IST = pytz.timezone('Asia/Kolkata')
+
 class TimezoneFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
         # Use Indian Standard Time (IST)
-        ist = pytz.timezone('Asia/Kolkata')
-        ct = datetime.datetime.fromtimestamp(record.created, ist)
+        ct = datetime.datetime.fromtimestamp(record.created, IST)
         if datefmt:
             s = ct.strftime(datefmt)
         else:
@@ -33,9 +40,6 @@ class TimezoneFormatter(logging.Formatter):
                 s = ct.isoformat()
         return s
         
-# Apply nest_asyncio for environments like Jupyter
-nest_asyncio.apply()
-
 # Load environment variables
 load_dotenv()
 
@@ -46,46 +50,148 @@ SEARCH_GROUP_ID = int(os.getenv('SEARCH_GROUP_ID'))
 STORAGE_GROUP_ID = int(os.getenv('STORAGE_GROUP_ID'))
 ADMIN_ID = int(os.getenv('ADMIN_ID'))
 PORT = int(os.getenv('PORT', 8088))  # Default to 8088 if not set
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()  # INFO for per-request logs
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public base URL; long polling is used when unset
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or uuid.uuid4().hex
+
+# Static reply texts, built once instead of re-sanitized on every send
+IMAGE_RECEIVED_TEXT = "✅ Image received! Now, please upload the movie file(s)."
+ADD_MOVIE_FAILED_TEXT = "❌ Failed to add the movie. Upload the image again to retry."
+UPLOAD_BOTH_TEXT = "❌ Please upload both a movie file and an image."
+EMPTY_QUERY_TEXT = "🚨 Provide a movie name to search. Use /search <movie_name>"
+SEARCH_ERROR_TEXT = "❌ An unexpected error occurred. Please try again later."
+FILES_SENT_TEXT = "✅ All files have been sent!"
+NO_FILES_TEXT = "❌ No files found for this movie."
+NO_RESULTS_TEXT = "❌ No movies found. Check the spelling and try again."
+SUGGESTIONS_TEXT = "🔍 No exact match. Did you mean:\n{titles}"
+FETCH_FILES_ERROR_TEXT = "❌ An error occurred while fetching the movie files."
+
+# /start greeting; telegram objects are immutable, so one markup is shared
+START_TEXT = "Hi {name}! 👋 Use me to search. 🎥"
+START_REPLY_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton("Add me to your chat! 🤖", url="https://t.me/+8h2UInNOV-o5YzI1")]]
+)
 
 # Logging Configuration
+file_handler = logging.FileHandler('bot.log', encoding='utf-8')  # Log to file
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
+    level=LOG_LEVEL,
     datefmt='%Y-%m-%d %H:%M:%S %Z',  # Include timezone in the date format
     handlers=[
         logging.StreamHandler(),  # Console output
-        logging.FileHandler('bot.log', encoding='utf-8')  # Log to file
+        # Buffer file writes; flushed every 1024 records or on any WARNING+
+        logging.handlers.MemoryHandler(capacity=1024, flushLevel=logging.WARNING, target=file_handler)
     ]
 )
 
 # Get the root logger and apply the custom formatter
 logger = logging.getLogger()
-for handler in logger.handlers:
+for handler in logger.handlers + [file_handler]:
     handler.setFormatter(TimezoneFormatter(
         fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S %Z'
     ))
 
 # MongoDB Client Setup
-def connect_mongo():
+# Keep a few connections warm so the first query of a burst doesn't pay
+# the TCP + TLS handshake. The async client never blocks the event loop.
+mongo_client = AsyncMongoClient(
+    DB_URL,
+    serverSelectionTimeoutMS=5000,
+    minPoolSize=5,
+    maxPoolSize=50,
+    maxConnecting=5,  # Open up to 5 connections at once when a burst drains the pool
+    maxIdleTimeMS=60000,
+    connectTimeoutMS=2000,
+    socketTimeoutMS=10000,
+    retryWrites=True,
+    # Compress replies on the wire; zlib is the fallback when zstd is unavailable
+    compressors="zstd,zlib"
+)
+collection = mongo_client['MoviesDB']['Movies']
+search_messages = mongo_client['MoviesDB']['SearchMessages']
+
+async def connect_mongo():
+    """Wait until MongoDB is reachable, then prepare the movies collection."""
     retries = 5
     while retries > 0:
         try:
-            client = MongoClient(DB_URL, serverSelectionTimeoutMS=5000)
-            db = client['MoviesDB']
-            collection = db['Movies']
-            client.admin.command('ping')
+            await mongo_client.admin.command('ping')
             logging.info("MongoDB connection established.")
-            return collection
+            await prepare_collection(collection)
+            await prepare_search_messages(search_messages)
+            return True
         except errors.ServerSelectionTimeoutError as e:
             logging.error(f"MongoDB connection failed. Retrying... {e}")
             retries -= 1
-            time.sleep(5)
+            await asyncio.sleep(5)
     logging.critical("Failed to connect to MongoDB.")
-    return None
+    return False
+
+def name_trigrams(name):
+    """Return the distinct lowercase 3-character substrings of `name`."""
+    name = name.lower()
+    return sorted({name[i:i + 3] for i in range(len(name) - 2)})
+
+def search_fields(name):
+    """Return the denormalized fields that movie search queries against."""
+    return {
+        'name_lower': name.lower(),
+        'name_trigrams': name_trigrams(name)
+    }
+
+async def prepare_collection(collection):
+    """Create search indexes and backfill search fields on older movies."""
+    try:
+        # B-tree index serves anchored prefix lookups on the lowercased name;
+        # the trailing fields are SEARCH_PROJECTION, so those lookups are
+        # answered from the index without fetching the movie documents
+        await collection.create_index(
+            [("name_lower", 1), ("movie_id", 1), ("name", 1), ("media.image.file_id", 1)]
+        )
+        try:
+            # Superseded by the covering index above
+            await collection.drop_index("name_lower_1")
+        except errors.OperationFailure:
+            pass
+        # Multikey index acts as an inverted trigram index for substring search
+        await collection.create_index("name_trigrams")
+        # Word index for out-of-order matches; no stemming or stop words for titles
+        await collection.create_index([("name", "text")], default_language="none")
+        try:
+            # Serves the duplicate lookup in write_movies() and stops the same
+            # file from being stored twice, even by another instance
+            await collection.create_index(
+                "media.documents.file_unique_id",
+                unique=True,
+                partialFilterExpression={"media.documents.file_unique_id": {"$exists": True}}
+            )
+        except errors.OperationFailure as e:
+            logging.error(f"Failed to create unique file index, duplicates may already be stored: {e}")
 
-collection = connect_mongo()
-search_group_messages = []
+        missing = collection.find(
+            {"$or": [{"name_lower": {"$exists": False}}, {"name_trigrams": {"$exists": False}}]},
+            {"name": 1}
+        )
+        updates = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": search_fields(doc.get("name", ""))})
+            async for doc in missing
+        ]
+        if updates:
+            await collection.bulk_write(updates, ordered=False)
+            logging.info(f"Backfilled search fields on {len(updates)} movie(s).")
+    except errors.PyMongoError as e:
+        logging.error(f"Failed to prepare movie indexes: {e}")
+
+async def prepare_search_messages(search_messages):
+    """Index tracked search replies by send time and expire forgotten ones."""
+    try:
+        # Bots can't delete messages older than 48 hours, so anything the
+        # hourly sweep missed by then is no longer worth keeping
+        await search_messages.create_index("sent_at", expireAfterSeconds=2 * 86400)
+    except errors.PyMongoError as e:
+        logging.error(f"Failed to prepare search reply index: {e}")
 
 # Helper function to sanitize Unicode text
 def sanitize_unicode(text):
@@ -94,52 +200,330 @@ def sanitize_unicode(text):
     """
     return text.encode('utf-8', 'ignore').decode('utf-8')
 
-# Temporary storage for incomplete movie uploads
-upload_sessions = defaultdict(lambda: {'files': [], 'image': None, 'caption': None})
+# LRU cache of recent search results, keyed by normalized query
+SEARCH_CACHE_TTL = 300   # Seconds a cached result stays fresh
+SEARCH_CACHE_SIZE = 512  # Distinct queries kept before evicting the oldest
+search_cache = OrderedDict()
+search_inflight = {}  # Normalized query -> lookup currently running for it
+search_cache_generation = 0  # Bumped on every invalidation
 
-async def add_movie(update: Update, context: CallbackContext):
-    """Process movie uploads, cleaning filenames and managing sessions."""
-    
-    def clean_filename(filename):
-        """Clean the uploaded filename by removing unnecessary tags and extracting relevant details."""
+# Only the fields a search preview needs; skips the documents list
+SEARCH_PROJECTION = {"_id": 0, "movie_id": 1, "name": 1, "media.image.file_id": 1}
+TEXT_SEARCH_PROJECTION = {**SEARCH_PROJECTION, "score": {"$meta": "textScore"}}
 
-        # Remove text inside square brackets (like [CK], [1080p])
-        filename = re.sub(r'\[.*?\]', '', filename)
+async def find_movies(key):
+    """
+    Return up to 10 movies whose lowercased name starts with `key`, falling
+    back to movies containing all of its words, then to movies whose name
+    contains each word, even partially.
+    """
+    # Names starting with `key` sort between `key` and `key` followed by the
+    # highest code point, so the prefix lookup is a plain index range scan
+    prefix_query = {"name_lower": {"$gte": key, "$lt": key + "\U0010ffff"}}
+    results = await collection.find(prefix_query, SEARCH_PROJECTION).limit(10).to_list()
+
+    words = [word for word in key.replace('"', ' ').split() if any(c.isalnum() for c in word)]
+    if not results and words:
+        # Quoting each word makes all of them required, in any order
+        text_query = {"$text": {"$search": " ".join(f'"{word}"' for word in words)}}
+        cursor = collection.find(text_query, TEXT_SEARCH_PROJECTION)
+        results = await cursor.sort([("score", {"$meta": "textScore"})]).limit(10).to_list()
+
+    # A name containing each word contains every trigram of every word, so
+    # the trigram index narrows candidates before the regexes run. Queries
+    # with no word of three or more characters stop here rather than
+    # scanning every movie.
+    fragments = key.split()
+    grams = sorted({gram for fragment in fragments for gram in name_trigrams(fragment)})
+    if not results and grams:
+        query = {
+            "name_trigrams": {"$all": grams},
+            "$and": [
+                {"name_lower": {"$regex": re.escape(fragment)}}
+                for fragment in fragments
+            ]
+        }
+        results = await collection.find(query, SEARCH_PROJECTION).limit(10).to_list()
 
-        # Remove prefixes like @TamilMob_LinkZz and leading special characters
-        filename = re.sub(r'^[@\W_]+', '', filename)  # Removes @, -, _, spaces at the start
+    return results
 
-        # Remove emojis and special characters
-        filename = re.sub(r'[^\x00-\x7F]+', '', filename)
+def invalidate_search_cache(names):
+    """
+    Drop cached searches that any of the lowercased `names` could now match.
+    Every search stage only matches names containing each word of the
+    query, so other cached results stay valid. Lookups already in flight
+    may have missed the new names, so they are not cached at all.
+    """
+    global search_cache_generation
+    search_cache_generation += 1
+    for key in list(search_cache):
+        words = [word for word in key.replace('"', ' ').split() if any(c.isalnum() for c in word)]
+        if any(all(word in name for word in words) for name in names):
+            del search_cache[key]
+
+async def lookup_and_cache(key):
+    """Run find_movies() for `key` and cache the results unless they raced an upload."""
+    generation = search_cache_generation
+    try:
+        results = await find_movies(key)
+    finally:
+        del search_inflight[key]
+
+    if generation != search_cache_generation:
+        # New movies were stored while this lookup ran
+        return results
+    search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, results)
+    search_cache.move_to_end(key)
+    if len(search_cache) > SEARCH_CACHE_SIZE:
+        search_cache.popitem(last=False)
+    return results
+
+async def query_movies(movie_name):
+    """
+    Return the results of find_movies() for `movie_name`. Results are cached
+    for SEARCH_CACHE_TTL seconds so popular titles don't hit MongoDB on every
+    message, and identical searches already in flight share one lookup.
+    """
+    key = movie_name.strip().lower()
+    cached = search_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        search_cache.move_to_end(key)
+        return cached[1]
+
+    pending = search_inflight.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(lookup_and_cache(key))
+        search_inflight[key] = pending
+    # Shielded so one cancelled search doesn't cancel the lookup others share
+    return await asyncio.shield(pending)
+
+SUGGESTION_CANDIDATES = 20  # Closest names by shared trigrams to rank in Python
+SUGGESTION_LIMIT = 5
+
+async def suggest_movies(update: Update, movie_name):
+    """Reply with titles close to `movie_name`, or that nothing was found."""
+    key = movie_name.strip().lower()
+    grams = name_trigrams(key)
+    names = []
+    if grams:
+        # Let the trigram index find names sharing the most trigrams with
+        # the query, so only a handful of candidates leave the server
+        pipeline = [
+            {"$match": {"name_trigrams": {"$in": grams}}},
+            {"$project": {"_id": 0, "name": 1, "shared": {"$size": {"$setIntersection": ["$name_trigrams", grams]}}}},
+            {"$sort": {"shared": -1}},
+            {"$limit": SUGGESTION_CANDIDATES}
+        ]
+        candidates = await (await collection.aggregate(pipeline)).to_list()
+        by_lower = {candidate['name'].lower(): candidate['name'] for candidate in candidates}
+        names = [by_lower[match] for match in difflib.get_close_matches(key, by_lower, n=SUGGESTION_LIMIT, cutoff=0.5)]
+
+    if names:
+        text = SUGGESTIONS_TEXT.format(titles="\n".join(f"• {name}" for name in names))
+        return await update.message.reply_text(sanitize_unicode(text))
+    return await update.message.reply_text(NO_RESULTS_TEXT)
+
+# Filename cleanup patterns, compiled once at import
+BRACKET_TAG_RE = re.compile(r'\[.*?\]')
+LEADING_JUNK_RE = re.compile(r'^[@\W_]+')
+NON_ASCII_RE = re.compile(r'[^\x00-\x7F]+')
+UNDERSCORE_SPACE_RE = re.compile(r'[_\s]+')
+UNWANTED_TAGS_RE = re.compile(r'(?i)(HDRip|10bit|x264|AAC\d*|MB|AMZN|WEB-DL|WEBRip|HEVC|x265|ESub|HQ|\.mkv|\.mp4|\.avi|\.mov|BluRay|DVDRip|720p|1080p|540p|SD|HD|CAM|DVDScr|R5|TS|Rip|BRRip|AC3|DualAudio|6CH|v\d+)(\W|$)')
+TITLE_YEAR_LANG_RE = re.compile(r'^(.*?)[\s_]*\(?(\d{4})\)?[\s_]*(Malayalam|Tamil|Hindi|Telugu|English)?', re.IGNORECASE)
+MULTI_SPACE_RE = re.compile(r'\s+')
+
+def clean_filename(filename):
+    """Clean the uploaded filename by removing unnecessary tags and extracting relevant details."""
+
+    # Remove text inside square brackets (like [CK], [1080p])
+    filename = BRACKET_TAG_RE.sub('', filename)
+
+    # Remove prefixes like @TamilMob_LinkZz and leading special characters
+    filename = LEADING_JUNK_RE.sub('', filename)  # Removes @, -, _, spaces at the start
+
+    # Remove emojis and special characters
+    filename = NON_ASCII_RE.sub('', filename)
+
+    # Replace underscores with spaces
+    filename = UNDERSCORE_SPACE_RE.sub(' ', filename).strip()
+
+    # Remove unwanted tags
+    filename = UNWANTED_TAGS_RE.sub(' ', filename).strip()
+
+    # Extract movie name, year, and language
+    match = TITLE_YEAR_LANG_RE.search(filename)
+
+    if match:
+        name = match.group(1).strip(" -._")  # Remove extra special characters
+        year = match.group(2).strip() if match.group(2) else ""
+        language = match.group(3).strip() if match.group(3) else ""
+
+        # Format the cleaned name
+        cleaned_name = f"{name} ({year}) {language}".strip()
+        return MULTI_SPACE_RE.sub(' ', cleaned_name)  # Remove extra spaces
+
+    # If no match is found, return the cleaned filename
+    return filename.strip(" -._")
+
+async def send_movie_preview(bot, chat_id, movie):
+    """Send a movie preview with a deep-link download button to `chat_id`."""
+    name = movie.get('name', 'Unknown Movie')
+    image_file_id = movie.get('media', {}).get('image', {}).get('file_id')
+
+    # Deep link opens the bot's PM with the movie ID
+    deep_link = f"https://t.me/{bot.username}?start={movie['movie_id']}"
+    keyboard = [[InlineKeyboardButton("🎬 Download", url=deep_link)]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
 
-        # Replace underscores with spaces
-        filename = re.sub(r'[_\s]+', ' ', filename).strip()
+    try:
+        if image_file_id:
+            return await bot.send_photo(
+                chat_id=chat_id,
+                photo=image_file_id,
+                caption=sanitize_unicode(f"🎥 **{name}**"),
+                parse_mode="Markdown",
+                reply_markup=reply_markup
+            )
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=sanitize_unicode(f"🎥 **{name}**"),
+            parse_mode="Markdown",
+            reply_markup=reply_markup
+        )
+    except Exception as e:
+        logging.error(f"Error sending preview for {sanitize_unicode(name)}: {sanitize_unicode(str(e))}")
+        return None
 
-        # Remove unwanted tags
-        pattern = r'(?i)(HDRip|10bit|x264|AAC\d*|MB|AMZN|WEB-DL|WEBRip|HEVC|x265|ESub|HQ|\.mkv|\.mp4|\.avi|\.mov|BluRay|DVDRip|720p|1080p|540p|SD|HD|CAM|DVDScr|R5|TS|Rip|BRRip|AC3|DualAudio|6CH|v\d+)(\W|$)'
-        filename = re.sub(pattern, ' ', filename).strip()
+MEDIA_GROUP_SIZE = 10  # Bot API limit for sendMediaGroup
 
-        # Extract movie name, year, and language
-        match = re.search(r'^(.*?)[\s_]*\(?(\d{4})\)?[\s_]*(Malayalam|Tamil|Hindi|Telugu|English)?', filename, re.IGNORECASE)
+async def send_movie_documents(bot, chat_id, documents, captions=True):
+    """Send a movie's files to `chat_id`, up to 10 per sendMediaGroup call."""
+    def caption(doc):
+        return sanitize_unicode(f"🎥 {doc.get('file_name', 'movie_file')}") if captions else None
 
-        if match:
-            name = match.group(1).strip(" -._")  # Remove extra special characters
-            year = match.group(2).strip() if match.group(2) else ""
-            language = match.group(3).strip() if match.group(3) else ""
+    async def send_one(doc):
+        try:
+            await bot.send_document(chat_id=chat_id, document=doc['file_id'], caption=caption(doc))
+        except Exception as e:
+            logging.error(f"Error sending document {doc['file_id']}: {sanitize_unicode(str(e))}")
+
+    files = [doc for doc in documents if doc.get('file_id')]
+    for i in range(0, len(files), MEDIA_GROUP_SIZE):
+        group = files[i:i + MEDIA_GROUP_SIZE]
+        if len(group) == 1:
+            # Media groups need at least two items
+            await send_one(group[0])
+            continue
+        try:
+            await bot.send_media_group(chat_id=chat_id, media=[
+                InputMediaDocument(doc['file_id'], caption=caption(doc)) for doc in group
+            ])
+        except Exception as e:
+            # One bad file fails the whole group; resend the rest individually
+            logging.error(f"Error sending media group, retrying files one by one: {sanitize_unicode(str(e))}")
+            for doc in group:
+                await send_one(doc)
+
+# Completed uploads waiting to be written to MongoDB in one batch
+MOVIE_BATCH_DELAY = 0.05  # Seconds to let a burst of uploads gather
+MOVIE_BATCH_SIZE = 50     # Maximum movies per bulk write
+movie_queue = asyncio.Queue()
+
+def restore_upload_session(entry, message):
+    """
+    Hand the files of a movie that failed to store back to its uploader's
+    session. The poster is not restored, so only a new image completes it.
+    """
+    session = upload_sessions.setdefault(message.from_user.id, {"files": [], "image": None})
+    # Files sent since the failed movie was queued stay after its own
+    session['files'][:0] = entry['media']['documents']
+
+async def write_movies(batch, bot):
+    """Insert a batch of queued movies, skipping files that are already stored."""
+    unique_ids = [doc['file_unique_id'] for entry, _ in batch for doc in entry['media']['documents']]
+    new_movies, duplicates = [], []
+    try:
+        # One $in lookup finds every already-stored file in the batch
+        existing = collection.find(
+            {"media.documents.file_unique_id": {"$in": unique_ids}},
+            {"media.documents.file_unique_id": 1}
+        )
+        stored = {
+            doc.get('file_unique_id')
+            async for movie in existing
+            for doc in movie['media']['documents']
+        }
+        for entry, message in batch:
+            keys = {doc['file_unique_id'] for doc in entry['media']['documents']}
+            if keys & stored:
+                duplicates.append((entry, message))
+            else:
+                stored |= keys
+                new_movies.append((entry, message))
+
+        if new_movies:
+            try:
+                await collection.bulk_write([InsertOne(entry) for entry, _ in new_movies], ordered=False)
+            except errors.BulkWriteError as e:
+                # Files stored since the lookup above trip the unique index
+                write_errors = e.details['writeErrors']
+                if any(error['code'] != 11000 for error in write_errors):
+                    raise
+                rejected = {error['index'] for error in write_errors}
+                duplicates += [movie for i, movie in enumerate(new_movies) if i in rejected]
+                new_movies = [movie for i, movie in enumerate(new_movies) if i not in rejected]
+            invalidate_search_cache([entry['name_lower'] for entry, _ in new_movies])
+    except Exception as e:
+        logging.error(f"Database error: {str(e)}")
+        for entry, message in batch:
+            restore_upload_session(entry, message)
+            await message.reply_text(ADD_MOVIE_FAILED_TEXT)
+        return
+
+    for entry, message in new_movies:
+        await message.reply_text(sanitize_unicode(f"✅ Successfully added movie: {entry['name']}"))
+        if SEARCH_GROUP_ID:
+            await send_movie_preview(bot, SEARCH_GROUP_ID, entry)
+    for entry, message in duplicates:
+        await message.reply_text(sanitize_unicode(f"⚠️ Already added: {entry['name']}"))
 
-            # Format the cleaned name
-            cleaned_name = f"{name} ({year}) {language}".strip()
-            return re.sub(r'\s+', ' ', cleaned_name)  # Remove extra spaces
+async def movie_writer(bot):
+    """
+    Drain movie_queue, writing each burst of uploads with a single bulk write.
+    Returns once it reaches a None put on the queue, after writing everything
+    queued before it.
+    """
+    stopping = False
+    while not stopping:
+        item = await movie_queue.get()
+        if item is None:
+            return
+        batch = [item]
+        await asyncio.sleep(MOVIE_BATCH_DELAY)
+        while len(batch) < MOVIE_BATCH_SIZE and not movie_queue.empty():
+            item = movie_queue.get_nowait()
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        try:
+            await write_movies(batch, bot)
+        except Exception as e:
+            logging.error(f"Movie writer error: {sanitize_unicode(str(e))}")
 
-        # If no match is found, return the cleaned filename
-        return filename.strip(" -._")
+# Temporary storage for incomplete movie uploads
+upload_sessions = defaultdict(lambda: {'files': [], 'image': None, 'caption': None})
 
+async def add_movie(update: Update, context: CallbackContext):
+    """Process movie uploads, cleaning filenames and managing sessions."""
+    
     async def process_movie_file(file_info, session, caption):
         """Handle the movie file upload."""
         filename = file_info.file_name
         cleaned_name = clean_filename(filename)
         session['files'].append({
             'file_id': file_info.file_id,
+            'file_unique_id': file_info.file_unique_id,
             'file_name': cleaned_name
         })
         session['caption'] = caption or session.get('caption', cleaned_name)
@@ -156,48 +540,9 @@ async def add_movie(update: Update, context: CallbackContext):
             'height': largest_photo.height
         }
         session['caption'] = caption or session.get('caption')
-        await update.message.reply_text(sanitize_unicode("✅ Image received! Now, please upload the movie file(s)."))
-
-    def create_deep_link(movie_id):
-        """Generate a deep link to the movie."""
-        return f"https://t.me/{context.bot.username}?start={movie_id}"
-
-    async def send_preview_to_group(movie_entry):
-        """Send the movie preview to the search group."""
-        name = movie_entry.get('name', 'Unknown Movie')
-        media = movie_entry.get('media', {})
-        image_file_id = media.get('image', {}).get('file_id')
-        deep_link = create_deep_link(movie_entry['movie_id'])
-
-        keyboard = [[InlineKeyboardButton("🎬 Download", url=deep_link)]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        try:
-            if image_file_id:
-                await context.bot.send_photo(
-                    chat_id=SEARCH_GROUP_ID,
-                    photo=image_file_id,
-                    caption=sanitize_unicode(f"🎥 **{name}**"),
-                    parse_mode="Markdown",
-                    reply_markup=reply_markup
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=SEARCH_GROUP_ID,
-                    text=sanitize_unicode(f"🎥 **{name}**"),
-                    parse_mode="Markdown",
-                    reply_markup=reply_markup
-                )
-        except Exception as e:
-            logging.error(f"Error sending preview for {sanitize_unicode(name)}: {sanitize_unicode(str(e))}")
+        await update.message.reply_text(IMAGE_RECEIVED_TEXT)
 
     # Main Logic
-    if update.effective_chat.id != STORAGE_GROUP_ID:
-        await update.message.reply_text(
-            sanitize_unicode("❌ You can only upload movies in the designated storage group. 🎥")
-        )
-        return
-
     user_id = update.effective_user.id
     session = upload_sessions.setdefault(user_id, {"files": [], "image": None})
     file_info = update.message.document
@@ -216,101 +561,105 @@ async def add_movie(update: Update, context: CallbackContext):
         movie_entry = {
             'movie_id': movie_id,
             'name': movie_name,
+            **search_fields(movie_name),
             'media': {
                 'documents': session['files'],
                 'image': session['image']
             }
         }
 
-        try:
-            collection.insert_one(movie_entry)
-            await update.message.reply_text(sanitize_unicode(f"✅ Successfully added movie: {movie_name}"))
-
-            if SEARCH_GROUP_ID:
-                await send_preview_to_group(movie_entry)
-
-            del upload_sessions[user_id]
-        except Exception as e:
-            logging.error(f"Database error: {str(e)}")
-            await update.message.reply_text(sanitize_unicode("❌ Failed to add the movie. Please try again later."))
+        # movie_writer() confirms once the batch containing it is stored
+        movie_queue.put_nowait((movie_entry, update.message))
+        del upload_sessions[user_id]
 
     elif not (file_info or image_info):
-        await update.message.reply_text(sanitize_unicode("❌ Please upload both a movie file and an image."))
+        await update.message.reply_text(UPLOAD_BOTH_TEXT)
                
 async def search_movie(update: Update, context: CallbackContext):
     """
     Search for a movie in the database and send preview to group.
     Clicking the deep link opens the bot's PM, where the user can download files.
     """
-    # Validate the command usage
-    if update.effective_chat.id != SEARCH_GROUP_ID:
-        await update.message.reply_text(
-            sanitize_unicode("❌ Use this feature in the designated search group.")
-        )
-        return
     # Get the movie name from the user's message
     movie_name = sanitize_unicode(update.message.text.strip())
     if not movie_name:
-        await update.message.reply_text(
-            sanitize_unicode("🚨 Provide a movie name to search. Use /search <movie_name>")
-        )
+        await update.message.reply_text(EMPTY_QUERY_TEXT)
         return
 
     try:
         # Search for the movie in the database
-        regex_pattern = re.compile(re.escape(movie_name), re.IGNORECASE)
-        results = list(collection.find({"name": {"$regex": regex_pattern}}).limit(10))
+        results = await query_movies(movie_name)
 
         if results:
-            # Send preview messages for each movie result
-            for result in results:
-                name = result.get('name', 'Unknown Movie')
-                media = result.get('media', {})
-                image_file_id = media.get('image', {}).get('file_id')
-
-                # Generate a direct deep link for bot PM with the movie ID
-                deep_link = f"https://t.me/{context.bot.username}?start={result['movie_id']}"
-
-                # Create an inline keyboard for the deep link
-                keyboard = [
-                    [InlineKeyboardButton(
-                        "🎬 Download", 
-                        url=deep_link
-                    )],
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                # Send movie preview with an image if available
-                if image_file_id:
-                    try:
-                        await context.bot.send_photo(
-                            chat_id=update.effective_chat.id,
-                            photo=image_file_id,
-                            caption=sanitize_unicode(f"🎥 **{name}**"),
-                            parse_mode="Markdown",
-                            reply_markup=reply_markup
-                        )
-                    except Exception as e:
-                        logging.error(
-                            f"Error sending preview for {sanitize_unicode(name)}: {sanitize_unicode(str(e))}"
-                        )
-                else:
-                    # If no image is available, send a text preview
-                    await update.message.reply_text(
-                        sanitize_unicode(f"🎥 **{name}**"),
-                        parse_mode="Markdown",
-                        reply_markup=reply_markup
-                    )
+            # Send all previews concurrently instead of one round-trip at a time
+            messages = await asyncio.gather(*(
+                send_movie_preview(context.bot, update.effective_chat.id, result)
+                for result in results
+            ))
+            await track_search_messages(messages)
         else:
             # Suggest similar movies or inform the user no results were found
-            await suggest_movies(update, movie_name)
+            message = await suggest_movies(update, movie_name)
+            await track_search_messages([message])
 
     except Exception as e:
         logging.error(f"Search error: {sanitize_unicode(str(e))}")
-        await update.message.reply_text(
-            sanitize_unicode("❌ An unexpected error occurred. Please try again later.")
-        )
+        await update.message.reply_text(SEARCH_ERROR_TEXT)
         
+# Search replies in the search group, stored as {sent_at, chat_id, message_id}
+# so they are still cleaned up after a restart
+SEARCH_MESSAGE_TTL = 86400  # Seconds before a search reply is cleaned up
+DELETE_BATCH_SIZE = 100     # Bot API limit for deleteMessages
+DELETE_CONCURRENCY = 5      # deleteMessages calls in flight at once
+
+async def track_search_messages(messages):
+    """Remember sent search replies so delete_old_messages() can remove them."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    docs = [
+        {"sent_at": now, "chat_id": message.chat_id, "message_id": message.message_id}
+        for message in messages if message is not None
+    ]
+    if not docs:
+        return
+    try:
+        await search_messages.insert_many(docs, ordered=False)
+    except errors.PyMongoError as e:
+        logging.error(f"Error tracking search replies: {e}")
+
+async def delete_old_messages(context: CallbackContext):
+    """Delete search replies older than SEARCH_MESSAGE_TTL, 100 per API call, a few calls at a time."""
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=SEARCH_MESSAGE_TTL)
+    expired = defaultdict(list)
+    tracked_ids = []
+    try:
+        async for doc in search_messages.find({"sent_at": {"$lt": cutoff}}).sort("sent_at", 1):
+            expired[doc["chat_id"]].append(doc["message_id"])
+            tracked_ids.append(doc["_id"])
+    except errors.PyMongoError as e:
+        logging.error(f"Error loading old search replies: {e}")
+        return
+
+    semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+    async def delete_batch(chat_id, message_ids):
+        async with semaphore:
+            try:
+                await context.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            except Exception as e:
+                logging.error(f"Error deleting old messages in {chat_id}: {sanitize_unicode(str(e))}")
+
+    await asyncio.gather(*(
+        delete_batch(chat_id, message_ids[i:i + DELETE_BATCH_SIZE])
+        for chat_id, message_ids in expired.items()
+        for i in range(0, len(message_ids), DELETE_BATCH_SIZE)
+    ))
+
+    if tracked_ids:
+        try:
+            await search_messages.delete_many({"_id": {"$in": tracked_ids}})
+        except errors.PyMongoError as e:
+            logging.error(f"Error forgetting old search replies: {e}")
+
 # New handler for retrieving movie files
 async def get_movie_files(update: Update, context: CallbackContext):
     """Send movie files to user via private message."""
@@ -322,7 +671,7 @@ async def get_movie_files(update: Update, context: CallbackContext):
 
     try:
         # Fetch movie details from database
-        movie = collection.find_one({"movie_id": movie_id})
+        movie = await collection.find_one({"movie_id": movie_id})
         
         if movie and 'media' in movie and 'documents' in movie['media']:
             # Send a message to the user
@@ -331,35 +680,17 @@ async def get_movie_files(update: Update, context: CallbackContext):
                 parse_mode="Markdown"
             )
 
-            # Send each document related to the movie
-            for doc in movie['media']['documents']:
-                document_file_id = doc.get('file_id')
-                document_file_name = doc.get('file_name', 'movie_file')
-                
-                if document_file_id:
-                    try:
-                        await context.bot.send_document(
-                            chat_id=query.from_user.id,
-                            document=document_file_id,
-                            caption=sanitize_unicode(f"🎥 {document_file_name}")
-                        )
-                    except Exception as e:
-                        logging.error(f"Error sending document: {sanitize_unicode(str(e))}")
-            
+            # Send the documents related to the movie
+            await send_movie_documents(context.bot, query.from_user.id, movie['media']['documents'])
+
             # Optional: Send a completion message
-            await query.message.reply_text(
-                sanitize_unicode("✅ All files have been sent!")
-            )
+            await query.message.reply_text(FILES_SENT_TEXT)
         else:
-            await query.message.reply_text(
-                sanitize_unicode("❌ No files found for this movie.")
-            )
+            await query.message.reply_text(NO_FILES_TEXT)
     
     except Exception as e:
         logging.error(f"Error fetching files for movie {movie_id}: {sanitize_unicode(str(e))}")
-        await query.message.reply_text(
-            sanitize_unicode("❌ An error occurred while fetching the movie files.")
-        )
+        await query.message.reply_text(FETCH_FILES_ERROR_TEXT)
 
 async def start(update: Update, context: CallbackContext):
     """Handle the /start command with default features or deep link for movies."""
@@ -371,7 +702,7 @@ async def start(update: Update, context: CallbackContext):
         movie_id = args[0]
         
         # Fetch movie details from database
-        movie = collection.find_one({"movie_id": movie_id})
+        movie = await collection.find_one({"movie_id": movie_id})
         
         if movie:
             name = movie.get('name', 'Unknown Movie')
@@ -390,26 +721,13 @@ async def start(update: Update, context: CallbackContext):
                 except Exception as e:
                     logging.error(f"Error sending movie details: {sanitize_unicode(str(e))}")
             # Send movie files
-            for doc in documents:
-                document_file_id = doc.get('file_id')
-                document_file_name = doc.get('file_name', 'movie_file')
-                if document_file_id:
-                    try:
-                        await context.bot.send_document(
-                            chat_id=update.effective_chat.id,
-                            document=document_file_id
-                        )
-                    except Exception as e:
-                        logging.error(f"Error sending file: {sanitize_unicode(str(e))}")
+            await send_movie_documents(context.bot, update.effective_chat.id, documents, captions=False)
 
             return
     # Default behavior when no movie_id is provided
-    keyboard = [[InlineKeyboardButton("Add me to your chat! 🤖", url="https://t.me/+8h2UInNOV-o5YzI1")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
-        text=f"Hi {sanitize_unicode(user_name)}! 👋 Use me to search. 🎥",
-        reply_markup=reply_markup
+        text=START_TEXT.format(name=sanitize_unicode(user_name)),
+        reply_markup=START_REPLY_MARKUP
     )
 
 # Define the /id command handler
@@ -427,13 +745,27 @@ async def id_command(update: Update, context: CallbackContext):
     # Send the response back to the user
     await update.message.reply_text(response)
 
-async def start_web_server():
-    """Start a web server for health checks."""
+async def start_web_server(application):
+    """Start a web server for health checks and, if configured, the webhook."""
     async def handle_health(request):
         return web.Response(text="Bot is running")
 
+    async def handle_update(request):
+        # Telegram echoes the secret given to set_webhook() in this header
+        if request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+            await application.update_queue.put(update)
+        except Exception as e:
+            logging.error(f"Error reading webhook update: {e}")
+            return web.Response(status=400)
+        return web.Response()
+
     app = web.Application()
     app.router.add_get('/', handle_health)
+    if WEBHOOK_URL:
+        app.router.add_post('/webhook', handle_update)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -442,54 +774,148 @@ async def start_web_server():
     logging.info(f"Web server running on port {PORT}")
 
 
-async def keep_awake():
+async def keep_awake(context: CallbackContext):
     """Ping the bot's hosting URL every 5 minutes to prevent sleeping."""
     url = "https://select-kitti-maxzues003-d3896a3f.koyeb.app/"
     max_retries = 5  # Maximum retries before giving up
     retry_delay = 10  # Start with a 10-second delay
 
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(max_retries):
-            try:
-                async with session.get(url) as resp:
-                    if resp.status == 200:
-                        logging.info("✅ Ping successful: Bot is awake")
-                        return  # Exit function on success
-                    else:
-                        logging.warning(f"⚠️ Ping failed (status {resp.status}), retrying...")
+    # Shared session opened in main(), so each ping reuses a pooled connection
+    session = context.bot_data['http_session']
+    for attempt in range(max_retries):
+        try:
+            async with session.get(url) as resp:
+                if resp.status == 200:
+                    logging.info("✅ Ping successful: Bot is awake")
+                    return  # Exit function on success
+                else:
+                    logging.warning(f"⚠️ Ping failed (status {resp.status}), retrying...")
 
-            except Exception as e:
-                logging.error(f"❌ Error pinging self: {e}")
+        except Exception as e:
+            logging.error(f"❌ Error pinging self: {e}")
 
-            # Exponential backoff before retrying
-            await asyncio.sleep(retry_delay)
-            retry_delay = min(retry_delay * 2, 300)  # Max backoff time = 5 minutes
+        # Exponential backoff before retrying
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, 300)  # Max backoff time = 5 minutes
 
     logging.critical("🚨 Max retries reached. Bot might be inactive!")
 
-# Schedule keep_awake() to run every 5 minutes
-aiocron.crontab("*/5 * * * *", func=keep_awake)
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from different chats concurrently, one at a time per chat."""
+
+    def __init__(self, max_concurrent_updates):
+        # The base class's slots would also be held by updates still waiting
+        # for their chat's turn, so it gets a loose bound and the real cap is
+        # applied below, only once an update can actually run
+        super().__init__(max(max_concurrent_updates, 4096))
+        self.running = asyncio.Semaphore(max_concurrent_updates)
+        self.chats = {}  # chat_id -> [lock, updates queued or running]
+
+    async def do_process_update(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self.running:
+                await coroutine
+            return
+
+        entry = self.chats.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self.running:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.chats[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
 
 async def main():
     """Main function to start the bot."""
     try:
-        await start_web_server()
-
-        application = ApplicationBuilder().token(TOKEN).build()
+        await connect_mongo()
+
+        # Smooth outgoing bursts under Telegram's flood limits instead of
+        # eating 429s and retries
+        rate_limiter = AIORateLimiter(
+            overall_max_rate=29,
+            overall_time_period=1,
+            group_max_rate=19,
+            group_time_period=60,
+            # Wait out Telegram's RetryAfter instead of failing the request
+            max_retries=3
+        )
+        # A slow search in one chat no longer holds up updates from the
+        # others, while uploads within a chat still arrive in order
+        application = (
+            ApplicationBuilder()
+            .token(TOKEN)
+            .rate_limiter(rate_limiter)
+            .concurrent_updates(ChatOrderedUpdateProcessor(64))
+            .build()
+        )
         application.add_handler(CommandHandler("start", start))
-        application.add_handler(MessageHandler(filters.Document.ALL, add_movie))
-        application.add_handler(MessageHandler(filters.PHOTO, add_movie))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, search_movie))
+        # Chat filters drop updates from other chats before any handler runs
+        storage_group = filters.Chat(STORAGE_GROUP_ID)
+        search_group = filters.Chat(SEARCH_GROUP_ID)
+        application.add_handler(MessageHandler(filters.Document.ALL & storage_group, add_movie))
+        application.add_handler(MessageHandler(filters.PHOTO & storage_group, add_movie))
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & search_group, search_movie))
         application.add_handler(CallbackQueryHandler(get_movie_files))
         application.add_handler(CommandHandler("id", id_command))
+        await start_web_server(application)
+
+        # Schedule keep_awake() to run every 5 minutes on the bot's own loop
+        application.job_queue.run_repeating(keep_awake, interval=300)
+        # Sweep expired search replies out of the search group every hour
+        application.job_queue.run_repeating(delete_old_messages, interval=3600)
 
-        await application.run_polling()
+        # Stop cleanly when the host sends SIGTERM; Ctrl+C cancels main()
+        stop_event = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+        except NotImplementedError:
+            pass  # Windows event loops have no signal handlers; rely on Ctrl+C
+
+        # One HTTP session for the bot's own outbound calls, closed on exit
+        http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        async with http_session, application:
+            application.bot_data['http_session'] = http_session
+            await application.start()
+            if WEBHOOK_URL:
+                # Telegram pushes updates to the web server as they happen
+                await application.bot.set_webhook(
+                    url=f"{WEBHOOK_URL.rstrip('/')}/webhook",
+                    secret_token=WEBHOOK_SECRET,
+                    max_connections=40,
+                    allowed_updates=["message", "callback_query"]
+                )
+            else:
+                await application.updater.start_polling()
+            writer_task = asyncio.create_task(movie_writer(application.bot))
+            try:
+                await stop_event.wait()
+            finally:
+                if application.updater.running:
+                    await application.updater.stop()
+                # Lets running handlers finish, so no uploads are queued after this
+                await application.stop()
+                # Store the uploads already queued instead of dropping them
+                movie_queue.put_nowait(None)
+                await writer_task
     except Exception as e:
         logging.error(f"Main loop error: {e}")
     finally:
+        await mongo_client.close()
         logging.info("Shutting down bot...")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     try:
         asyncio.run(main())
     except KeyboardInterrupt: